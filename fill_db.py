@@ -2,7 +2,7 @@ import pandas as pd
 import sqlalchemy
 from sqlalchemy import create_engine, text, inspect
 from faker import Faker
-import networkx as nx
+import fk_resolver
 import random
 import uuid
 from datetime import datetime, timedelta
@@ -41,22 +41,26 @@ def get_sorted_tables(engine):
     inspector = inspect(engine)
     table_names = inspector.get_table_names()
     
-    G = nx.DiGraph()
-    G.add_nodes_from(table_names)
+    fk_map = {}
+    nullable = {}
     
     print("🕸️  Tablo ilişkileri analiz ediliyor...")
     for table in table_names:
         fks = inspector.get_foreign_keys(table)
         for fk in fks:
-            parent = fk['referred_table']
-            if parent != table:
-                G.add_edge(parent, table)
+            for col in fk['constrained_columns']:
+                fk_map.setdefault(table, {})[col] = fk['referred_table']
+        for col in inspector.get_columns(table):
+            nullable[(table, col['name'])] = col.get('nullable', True)
     
-    try:
-        ordered = list(nx.topological_sort(G))
-    except nx.NetworkXUnfeasible:
-        print("⚠️ Döngüsel ilişki tespit edildi, alfabetik sıraya yakın işlem yapılacak.")
-        ordered = table_names
+    # Döngüler (self-reference dahil) SCC bazında kırılır, sıralama hiçbir zaman atlanmaz
+    ordered, deferred, _ = fk_resolver.resolve_insert_order(
+        table_names, fk_map, lambda t, c: nullable.get((t, c), True))
+    if deferred:
+        cols = ', '.join(f"{t}.{c}" for t, d in deferred.items() for c in d)
+        # fill_db FK değerlerini çözmez (int kolonlara rastgele değer basar), sadece sıralama kazanır;
+        # ertelenen FK'ları geri dolduran akış run_engine.py'dedir
+        print(f"🔁 Döngüsel ilişki tespit edildi, sıralama için şu FK'lar yok sayıldı: {cols}")
         
     return ordered
 
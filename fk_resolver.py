@@ -0,0 +1,190 @@
+import logging
+import networkx as nx
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+KEY_CHUNK = 1000  # SQL Server'da tek INSERT ... VALUES en fazla 1000 satır alır
+
+# Döngüdeki FK kolonlarını tek seferde (set-based) dolduran T-SQL.
+# Sadece bu çalıştırmada eklenen ({keys}) ve kolonu boş/sahipsiz kalan satırlar,
+# parent tablodaki satırlara ROW_NUMBER % COUNT ile eşlenir; satır satır round-trip yoktur.
+BACKFILL_SQL = """
+WITH c AS (
+    SELECT t.[{col}], ROW_NUMBER() OVER (ORDER BY (SELECT NULL)) - 1 AS rn
+    FROM [{child}] t
+    WHERE t.[{child_pk}] {keys}
+      AND (t.[{col}] IS NULL
+           OR NOT EXISTS (SELECT 1 FROM [{parent}] p WHERE p.[{parent_pk}] = t.[{col}]))
+),
+p AS (
+    SELECT [{parent_pk}] AS ref_id, ROW_NUMBER() OVER (ORDER BY NEWID()) - 1 AS rn
+    FROM [{parent}]
+),
+n AS (SELECT COUNT(*) AS cnt FROM [{parent}])
+UPDATE c SET c.[{col}] = p.ref_id
+FROM c
+CROSS JOIN n
+JOIN p ON p.rn = c.rn % NULLIF(n.cnt, 0)
+WHERE n.cnt > 0
+"""
+
+# Self-reference için: satırlar önce mevcutlar, sonra yeni eklenenler (PK sırasıyla)
+# numaralanır ve g. satır (g - 1) / 2. satıra bağlanır. Sonuç bir ağaçtır: kimse
+# kendine ya da kendinden sonrakine işaret etmez, tablo boşsa ilk yeni satır kök (NULL) kalır.
+BACKFILL_SELF_SQL = """
+WITH k AS (
+    SELECT t.[{pk}] AS ref_id, CASE WHEN t.[{pk}] {keys} THEN 1 ELSE 0 END AS is_new
+    FROM [{table}] t
+),
+r AS (
+    SELECT ref_id, ROW_NUMBER() OVER (ORDER BY is_new, ref_id) - 1 AS g
+    FROM k
+)
+UPDATE t SET t.[{col}] = p.ref_id
+FROM [{table}] t
+JOIN r me ON me.ref_id = t.[{pk}]
+JOIN r p ON p.g = (me.g - 1) / 2
+WHERE me.g > 0
+  AND t.[{pk}] {keys}
+  AND (t.[{col}] IS NULL
+       OR NOT EXISTS (SELECT 1 FROM [{table}] x WHERE x.[{pk}] = t.[{col}]))
+"""
+
+# Geri doldurmadan sonra hâlâ parent'ı olmayan satır sayısı
+ORPHAN_SQL = """
+SELECT COUNT(*) FROM [{child}] t
+WHERE t.[{child_pk}] {keys}
+  AND t.[{col}] IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM [{parent}] p WHERE p.[{parent_pk}] = t.[{col}])
+"""
+
+
+def build_fk_graph(tables, fk_map):
+    """Parent -> Child yönlü graf. Kenar üzerinde ilişkiyi kuran kolonlar tutulur."""
+    G = nx.DiGraph()
+    G.add_nodes_from(tables)
+    for child in tables:
+        for col, parent in fk_map.get(child, {}).items():
+            if parent not in G: continue
+            if G.has_edge(parent, child):
+                G[parent][child]['cols'].append(col)
+            else:
+                G.add_edge(parent, child, cols=[col])
+    return G
+
+
+def _pick_edge(G, cycle, is_nullable):
+    """
+    Döngüyü kırmak için ertelenecek kenarı seçer.
+    Tüm kolonları NULL olabilen kenarlar tercih edilir, sonra en az kolonlu olan.
+    """
+    def cost(edge):
+        parent, child = edge
+        cols = G[parent][child]['cols']
+        forced = sum(1 for col in cols if not is_nullable(child, col))
+        return (forced, len(cols))
+    return min(((u, v) for u, v in cycle), key=cost)
+
+
+def resolve_insert_order(tables, fk_map, is_nullable):
+    """
+    Self-reference ve döngüsel FK gruplarını strongly connected component'lere ayırır.
+    Her grupta döngüler greedy bir sezgiyle kırılır: find_cycle ile bulunan her döngüden
+    en ucuz kenar (önce NULL olabilen, sonra az kolonlu) ertelenir. Bu minimum feedback
+    arc set garantisi vermez ama gerçek şemalardaki küçük döngüler için yeterlidir.
+    Kalan graf topolojik sıralanır.
+
+    Dönüş: (order, deferred, forced)
+      order    : tek geçişte insert sırası (Parent -> Child)
+      deferred : {child: {kolon: parent}} insert'te boş bırakılıp sonra doldurulacaklar
+      forced   : [(child, kolon)] ertelenmek zorunda kalan NOT NULL kolonlar
+                 (bunlar için constraint'ler kapalı olmalı)
+    """
+    G = build_fk_graph(tables, fk_map)
+    deferred = {}
+    forced = []
+
+    for scc in nx.strongly_connected_components(G):
+        if len(scc) == 1:
+            node = next(iter(scc))
+            if not G.has_edge(node, node): continue
+        sub = G.subgraph(scc).copy()
+        while True:
+            try:
+                cycle = nx.find_cycle(sub)
+            except nx.NetworkXNoCycle:
+                break
+            parent, child = _pick_edge(sub, cycle, is_nullable)
+            for col in sub[parent][child]['cols']:
+                deferred.setdefault(child, {})[col] = parent
+                if not is_nullable(child, col):
+                    forced.append((child, col))
+            sub.remove_edge(parent, child)
+            G.remove_edge(parent, child)
+
+    order = list(nx.topological_sort(G))
+    return order, deferred, forced
+
+
+def key_filter(conn, child, child_pk, keys):
+    """
+    Bu çalıştırmada eklenen satırları seçen SQL parçası ve parametreleri.
+    Identity tablolarda (min, max) aralığı BETWEEN ile, üretilen PK'larda anahtarlar
+    #backfill_keys geçici tablosuna toplu yazılıp IN (SELECT ...) ile kullanılır;
+    anahtar sayısı SQL Server'ın 2100 parametre sınırına takılmaz.
+    """
+    if isinstance(keys, tuple):
+        return "BETWEEN :lo AND :hi", {"lo": keys[0], "hi": keys[1]}
+    conn.execute(text("IF OBJECT_ID('tempdb..#backfill_keys') IS NOT NULL DROP TABLE #backfill_keys"))
+    conn.execute(text(f"SELECT TOP 0 [{child_pk}] AS k INTO #backfill_keys FROM [{child}]"))
+    for i in range(0, len(keys), KEY_CHUNK):
+        part = keys[i:i + KEY_CHUNK]
+        values = ", ".join(f"(:k{j})" for j in range(len(part)))
+        conn.execute(text(f"INSERT INTO #backfill_keys (k) VALUES {values}"), {f"k{j}": v for j, v in enumerate(part)})
+    return "IN (SELECT k FROM #backfill_keys)", {}
+
+
+def backfill_references(conn, deferred, get_pk, inserted_keys):
+    """
+    Ertelenen her FK kolonu için tek bir toplu UPDATE çalıştırır.
+    Sadece inserted_keys'teki ({tablo: (min, max) | [pk, ...]}) bu çalıştırmada eklenen satırlara dokunur.
+    """
+    total = 0
+    for child, cols in deferred.items():
+        keys = inserted_keys.get(child)
+        if not keys: continue
+        child_pk = get_pk(conn, child)
+        keys_sql, params = key_filter(conn, child, child_pk, keys)
+        for col, parent in cols.items():
+            parent_pk = get_pk(conn, parent)
+            if parent == child:
+                sql = BACKFILL_SELF_SQL.format(table=child, col=col, pk=child_pk, keys=keys_sql)
+            else:
+                sql = BACKFILL_SQL.format(child=child, col=col, child_pk=child_pk, parent=parent, parent_pk=parent_pk, keys=keys_sql)
+            try:
+                res = conn.execute(text(sql), params)
+                total += max(res.rowcount, 0)
+                logger.info(f"   🔁 {child}.{col} -> {parent}.{parent_pk}: {res.rowcount} satır güncellendi.")
+            except Exception as e:
+                err = str(e).split(']')[0]
+                logger.error(f"   ❌ {child}.{col} geri doldurulamadı: {err}")
+    return total
+
+
+def report_orphans(conn, deferred, get_pk, inserted_keys):
+    """Geri doldurmadan sonra parent'ı olmayan satırları kolon bazında sayar ve hata olarak loglar."""
+    orphans = {}
+    for child, cols in deferred.items():
+        keys = inserted_keys.get(child)
+        if not keys: continue
+        child_pk = get_pk(conn, child)
+        keys_sql, params = key_filter(conn, child, child_pk, keys)
+        for col, parent in cols.items():
+            sql = ORPHAN_SQL.format(child=child, col=col, child_pk=child_pk, parent=parent,
+                                    parent_pk=get_pk(conn, parent), keys=keys_sql)
+            count = conn.execute(text(sql), params).scalar()
+            if count:
+                orphans[(child, col)] = count
+                logger.error(f"   ❌ {child}.{col}: {count} satır hâlâ sahipsiz ({parent} boş ya da insert'i başarısız).")
+    return orphans
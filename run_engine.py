@@ -1,5 +1,6 @@
 import sqlalchemy
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, inspect, select, MetaData, Table
+from sqlalchemy.dialects.mssql import TIMESTAMP as MSSQL_TIMESTAMP
 from faker import Faker
 import pandas as pd
 import urllib
@@ -7,14 +8,22 @@ import random
 import uuid
 import logging
 import time
+import json
+import os
 from datetime import datetime
 import re
+import numpy as np
+import value_pool
+import fk_resolver
 
 # --- LOG AYARLARI ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s', datefmt='%H:%M:%S')
 logger = logging.getLogger(__name__)
 
 # --- AYARLAR ---
+# 'synthetic': KEYWORD_MAP ile sıfırdan üretim
+# 'subset'   : kaynak DB'den ilişkisel tutarlı örnek alıp PII kolonlarını maskeleyerek basar
+MODE = 'synthetic'
 ROW_COUNT = 15
 DB_NAME = ""
 SERVER_NAME =""
@@ -23,6 +32,9 @@ SERVER_NAME =""
 SKIP_TABLES = ['__EFMigrationsHistory', 'sysdiagrams', 'dtproperties']
 # Atlanacak Kolonlar (Sistem kolonları)
 SKIP_COLS = ['LogId', 'CreateDate', 'CreatedBy', 'UpdateDate', 'UpdatedBy']
+# True ise constraint'ler her durumda kapatılır. False ise sadece NOT NULL bir
+# kolonla kurulmuş döngü varsa kapatılır (fk_resolver'ın 'forced' listesi)
+DISABLE_CONSTRAINTS = False
 
 # Güvenli Veri Tipleri (Bunun dışındakilere veri basmayız)
 SAFE_TYPES = [
@@ -42,8 +54,20 @@ TARGET_CONN_STR = (
     "TrustServerCertificate=yes;"
 )
 
-fake = Faker('tr_TR')
+FAKER_LOCALE = 'tr_TR'
+# --- SUBSET & MASK AYARLARI ---
+SOURCE_CONN_STR = ""
+SUBSET_ROOTS = {}          # Başlangıç tabloları ve satır limiti, örn: {'Cari': 100, 'Stok': 200}
+SUBSET_MAX_ROWS = 5000     # Aşağı (child) yönde bir tabloya en fazla kaç satır çekilsin
+SUBSET_CHUNK = 500         # IN (...) sorgularında tek seferde gönderilen anahtar sayısı
+MASK_SALT = 'linkerp-mask-01!'   # hash_pandas_object için tam 16 karakter olmalı
+RULES_FILE = 'data_rules.json'
+
+fake = Faker(FAKER_LOCALE)
 ID_CACHE = {}
+# Bu çalıştırmada eklenen satırlar (sadece backfill yapılacak tablolar için):
+# identity PK'da (min, max) aralığı, üretilen PK'da anahtar listesi
+INSERTED_KEYS = {}
 
 # --- TÜRKÇE ERP SÖZLÜĞÜ ---
 # Kolon adında bu kelimeler geçerse özel üretici kullanılır
@@ -78,6 +102,14 @@ KEYWORD_MAP = {
     'URL': lambda: fake.url()
 }
 
+# Faker ile üretimi pahalı olan metin sağlayıcıları: bunlar bir kez üretilip
+# diskteki havuzdan (value_pool) index ile okunur
+POOLED_KEYS = [
+    'IBAN', 'MAIL', 'EPOSTA', 'UNVAN', 'SIRKET', 'AD', 'SOYAD', 'ADRES',
+    'SEHIR', 'IL', 'ILCE', 'ACIKLAMA', 'NOT', 'BARKOD', 'STOKADI', 'URUNADI',
+    'WEB', 'URL'
+]
+
 def get_engine():
     params = urllib.parse.quote_plus(TARGET_CONN_STR)
     return create_engine(f"mssql+pyodbc:///?odbc_connect={params}", connect_args={'timeout': 10})
@@ -121,6 +153,16 @@ def get_table_info(conn, table_name):
 
 def get_fk_map(conn):
     """Hangi tablo kime bağlı? Foreign Key haritasını çıkarır."""
+    fk_map = {} # {'StokHareket': {'StokId': 'Stok'}}
+    if conn.dialect.name != 'mssql':
+        # SQL Server dışı (örn. SQLite) kaynaklarda SQLAlchemy inspector kullanılır
+        insp = inspect(conn)
+        for tbl in insp.get_table_names():
+            for fk in insp.get_foreign_keys(tbl):
+                for col in fk['constrained_columns']:
+                    fk_map.setdefault(tbl, {})[col] = fk['referred_table']
+        return fk_map
+
     sql = text("""
         SELECT 
             OBJECT_NAME(f.parent_object_id) AS TableName,
@@ -129,7 +171,6 @@ def get_fk_map(conn):
         FROM sys.foreign_keys AS f
         INNER JOIN sys.foreign_key_columns AS fc ON f.object_id = fc.constraint_object_id
     """)
-    fk_map = {} # {'StokHareket': {'StokId': 'Stok'}}
     try:
         result = conn.execute(sql).fetchall()
         for row in result:
@@ -139,13 +180,19 @@ def get_fk_map(conn):
     except: pass
     return fk_map
 
+def get_nullable_map(conn):
+    """Tüm kolonların NULL kabul edip etmediğini tek sorguda çeker: {(tablo, kolon): bool}"""
+    sql = text("SELECT TABLE_NAME, COLUMN_NAME, IS_NULLABLE FROM INFORMATION_SCHEMA.COLUMNS")
+    return {(r[0], r[1]): r[2] == 'YES' for r in conn.execute(sql).fetchall()}
+
+def get_pk_column(conn, table_name):
+    pk_sql = text(f"SELECT TOP 1 c.COLUMN_NAME FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc JOIN INFORMATION_SCHEMA.CONSTRAINT_COLUMN_USAGE ccu ON tc.CONSTRAINT_NAME = ccu.CONSTRAINT_NAME JOIN INFORMATION_SCHEMA.COLUMNS c ON c.TABLE_NAME = ccu.TABLE_NAME AND c.COLUMN_NAME = ccu.COLUMN_NAME WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY' AND tc.TABLE_NAME = :t_name")
+    res = conn.execute(pk_sql, {"t_name": table_name}).fetchone()
+    return res[0] if res else "Id"
+
 def fetch_ids(conn, table_name):
     try:
-        # PK bul
-        pk_sql = text(f"SELECT TOP 1 c.COLUMN_NAME FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc JOIN INFORMATION_SCHEMA.CONSTRAINT_COLUMN_USAGE ccu ON tc.CONSTRAINT_NAME = ccu.CONSTRAINT_NAME JOIN INFORMATION_SCHEMA.COLUMNS c ON c.TABLE_NAME = ccu.TABLE_NAME AND c.COLUMN_NAME = ccu.COLUMN_NAME WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY' AND tc.TABLE_NAME = :t_name")
-        res = conn.execute(pk_sql, {"t_name": table_name}).fetchone()
-        pk_col = res[0] if res else "Id"
-        
+        pk_col = get_pk_column(conn, table_name)
         sql = text(f"SELECT TOP 1000 [{pk_col}] FROM [{table_name}] WITH (NOLOCK)")
         res = conn.execute(sql).fetchall()
         ID_CACHE[table_name] = [r[0] for r in res]
@@ -157,7 +204,10 @@ def generate_smart_value(col_name, col_info, fk_ref_table):
     if fk_ref_table:
         if fk_ref_table in ID_CACHE and ID_CACHE[fk_ref_table]:
             return random.choice(ID_CACHE[fk_ref_table])
-        # İlişki var ama veri yoksa, veri tipine göre uydur (Fallback)
+        # İlişki var ama veri yoksa: NULL olabiliyorsa boş bırak (sahipsiz referans üretme)
+        if col_info['nullable']: return None
+        # NOT NULL kolonlar buraya sadece ertelenen (forced) döngü kolonu olarak gelir;
+        # constraint'ler kapalıyken yer tutucu basılır, backfill adımı gerçek referansla değiştirir
         if 'uniqueidentifier' in col_info['type']: return str(uuid.uuid4())
         return random.randint(1, 10)
 
@@ -203,82 +253,463 @@ def generate_smart_value(col_name, col_info, fk_ref_table):
     return fake.sentence(nb_words=5)[:length]
 
 def main():
+    global KEYWORD_MAP
     engine = get_engine()
-    
-    # Global FK Haritasını Çıkar
-    with engine.connect() as conn:
-        logger.info("🔗 İlişki haritası (FK) çıkarılıyor...")
-        FK_MAP = get_fk_map(conn)
-        
-        # Tablo listesi (Bağımlılık sırasına gerek yok, retry mantığı ile çözeceğiz veya ID check ile)
-        # Basit olsun diye DB'deki sırayla alıp, ID'leri buldukça kullanacağız.
-        tables_res = conn.execute(text("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE='BASE TABLE'")).fetchall()
-        all_tables = [r[0] for r in tables_res]
 
-    logger.info(f"🚀 {len(all_tables)} tablo için Türkçe veri üretimi başlıyor...")
+    try:
+        logger.info("🧺 Değer havuzları hazırlanıyor...")
+        KEYWORD_MAP = value_pool.pooled_providers(KEYWORD_MAP, POOLED_KEYS, FAKER_LOCALE)
 
-    for i, table in enumerate(all_tables, 1):
-        if any(x in table for x in SKIP_TABLES) or 'AspNet' in table: continue
+        # Global FK Haritasını Çıkar
+        with engine.connect() as conn:
+            logger.info("🔗 İlişki haritası (FK) çıkarılıyor...")
+            FK_MAP = get_fk_map(conn)
         
-        # Tek tek her tablo için işlem (Transaction per table)
-        try:
-            with engine.begin() as conn:
-                # 1. Kilitleri Aç (Sadece bu tablo için değil global açmak daha güvenli ama burada connection bazlı)
-                conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? NOCHECK CONSTRAINT all'"))
-                conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? DISABLE TRIGGER all'"))
+            tables_res = conn.execute(text("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE='BASE TABLE'")).fetchall()
+            tables = [r[0] for r in tables_res if not (any(x in r[0] for x in SKIP_TABLES) or 'AspNet' in r[0])]
+            nullable_map = get_nullable_map(conn)
+
+        # Bağımlılık sırası: döngüler SCC bazında çözülür, döngüyü kıran FK'lar ertelenir
+        all_tables, deferred, forced = fk_resolver.resolve_insert_order(
+            tables, FK_MAP, lambda t, c: nullable_map.get((t, c), True))
+        deferred_count = sum(len(cols) for cols in deferred.values())
+        if deferred_count:
+            logger.info(f"🔁 Döngüsel ilişkiler için {deferred_count} FK kolonu sonradan doldurulacak.")
+        keep_constraints_off = DISABLE_CONSTRAINTS or bool(forced)
+        if forced:
+            logger.warning(f"⚠️ NOT NULL döngü kolonları var ({', '.join(f'{t}.{c}' for t, c in forced)}), constraint'ler kapatılacak.")
+
+        logger.info(f"🚀 {len(all_tables)} tablo için Türkçe veri üretimi başlıyor...")
+
+        for i, table in enumerate(all_tables, 1):
+            # Tek tek her tablo için işlem (Transaction per table)
+            try:
+                with engine.begin() as conn:
+                    # 1. Kilitleri Aç (Sıralama doğruysa FK constraint'lerine dokunmaya gerek yok)
+                    if keep_constraints_off:
+                        conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? NOCHECK CONSTRAINT all'"))
+                    conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? DISABLE TRIGGER all'"))
 
-                # 2. Kolonları Analiz Et
-                col_infos = get_table_info(conn, table)
-                if not col_infos: continue
+                    # 2. Kolonları Analiz Et
+                    col_infos = get_table_info(conn, table)
+                    if not col_infos: continue
                 
-                # 3. Parent ID Hazırlığı (Bu tablonun FK'ları kim?)
-                my_fks = FK_MAP.get(table, {})
-                for col, parent in my_fks.items():
-                    if parent not in ID_CACHE: fetch_ids(conn, parent)
-
-                data_list = []
-                for _ in range(ROW_COUNT):
-                    row = {}
-                    for col, info in col_infos.items():
-                        if info['is_identity'] or info['is_computed']: continue
-                        if col in SKIP_COLS: continue
-                        
-                        # FK Referansı var mı?
-                        fk_ref = my_fks.get(col)
+                    # 3. Parent ID Hazırlığı (Bu tablonun FK'ları kim?)
+                    my_fks = FK_MAP.get(table, {})
+                    my_deferred = deferred.get(table, {})
+                    for col, parent in my_fks.items():
+                        if col in my_deferred: continue
+                        if parent not in ID_CACHE: fetch_ids(conn, parent)
+
+                    # NOT NULL FK'nın parent'ında (atlanmış ya da boş tablo) kayıt yoksa sahipsiz
+                    # referans basmak yerine tabloyu atla; bu tabloya bağlı olanlar da aynı kontrole takılır
+                    missing = [f"{col} -> {parent}" for col, parent in my_fks.items()
+                               if col not in my_deferred and col in col_infos and col not in SKIP_COLS
+                               and not col_infos[col]['nullable'] and not ID_CACHE.get(parent)]
+                    if missing:
+                        logger.warning(f"⚠️ ({i}/{len(all_tables)}) {table}: parent kaydı yok ({', '.join(missing)}), tablo atlandı.")
+                        continue
+
+                    data_list = []
+                    for _ in range(ROW_COUNT):
+                        row = {}
+                        for col, info in col_infos.items():
+                            if info['is_identity'] or info['is_computed']: continue
+                            if col in SKIP_COLS: continue
                         
-                        val = generate_smart_value(col, info, fk_ref)
+                            # Ertelenen döngü kolonu: NULL bırak, backfill dolduracak
+                            if col in my_deferred and info['nullable']:
+                                row[col] = None
+                                continue
+
+                            # FK Referansı var mı?
+                            fk_ref = my_fks.get(col)
+                            if col in my_deferred: fk_ref = '__deferred__' # ID_CACHE'te yok -> yer tutucu (forced)
+
+                            val = generate_smart_value(col, info, fk_ref)
                         
-                        # String Kırpma (Güvenlik)
-                        if 'char' in info['type'] and isinstance(val, str) and info['length'] > 0:
-                            val = val[:info['length']]
+                            # String Kırpma (Güvenlik)
+                            if 'char' in info['type'] and isinstance(val, str) and info['length'] > 0:
+                                val = val[:info['length']]
                             
-                        row[col] = val
-                    data_list.append(row)
+                            row[col] = val
+                        data_list.append(row)
                 
-                if data_list:
-                    df = pd.DataFrame(data_list)
-                    df.to_sql(table, conn, if_exists='append', index=False)
-                    logger.info(f"✅ ({i}/{len(all_tables)}) {table}: {len(df)} kayıt basıldı.")
-                else:
-                    logger.warning(f"⚠️ ({i}/{len(all_tables)}) {table}: Veri üretilemedi.")
+                    if data_list:
+                        df = pd.DataFrame(data_list)
+                        pk_col = get_pk_column(conn, table) if table in deferred else None
+                        max_before = None
+                        if pk_col and pk_col not in df.columns:
+                            # Identity PK: bu çalıştırmanın satırları eski MAX(pk)'dan büyük olanlardır
+                            max_before = conn.execute(text(f"SELECT MAX([{pk_col}]) FROM [{table}]")).scalar()
+                        df.to_sql(table, conn, if_exists='append', index=False)
+                        if pk_col:
+                            if pk_col in df.columns:
+                                INSERTED_KEYS[table] = df[pk_col].tolist()
+                            else:
+                                where = f" WHERE [{pk_col}] > :m" if max_before is not None else ""
+                                lo, hi = conn.execute(text(f"SELECT MIN([{pk_col}]), MAX([{pk_col}]) FROM [{table}]{where}"), {"m": max_before}).fetchone()
+                                if lo is not None: INSERTED_KEYS[table] = (lo, hi)
+                        logger.info(f"✅ ({i}/{len(all_tables)}) {table}: {len(df)} kayıt basıldı.")
+                    else:
+                        logger.warning(f"⚠️ ({i}/{len(all_tables)}) {table}: Veri üretilemedi.")
                 
-                # Bitiş: ID'leri hafızaya al (Diğer tablolar kullansın)
-                fetch_ids(conn, table)
+                    # Bitiş: ID'leri hafızaya al (Diğer tablolar kullansın)
+                    fetch_ids(conn, table)
 
-        except Exception as e:
-            err = str(e).split(']')[0]
-            logger.error(f"❌ {table}: {err}")
+            except Exception as e:
+                err = str(e).split(']')[0]
+                logger.error(f"❌ {table}: {err}")
             
-    # En son kilitleri kapat
-    try:
-        with engine.begin() as conn:
-            logger.info("🔒 Sistem kilitleri kapatılıyor...")
-            conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? CHECK CONSTRAINT all'"))
-            conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? ENABLE TRIGGER all'"))
-    except: pass
-    
+        # Ertelenen FK'ları toplu UPDATE ile doldur (kolon başına tek sorgu)
+        if deferred:
+            try:
+                with engine.begin() as conn:
+                    logger.info("🔁 Döngüsel FK kolonları geri dolduruluyor...")
+                    conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? DISABLE TRIGGER all'"))
+                    fk_resolver.backfill_references(conn, deferred, get_pk_column, INSERTED_KEYS)
+                    # Hâlâ sahipsiz kalan satırlar (parent boş kaldı ya da insert'i hata verdi) raporlanır;
+                    # CHECK CONSTRAINT mevcut satırları doğrulamadığı için bunlar sessizce kalmasın
+                    fk_resolver.report_orphans(conn, deferred, get_pk_column, INSERTED_KEYS)
+            except Exception as e:
+                err = str(e).split(']')[0]
+                logger.error(f"❌ Geri doldurma: {err}")
+
+        # En son kilitleri kapat
+        try:
+            with engine.begin() as conn:
+                logger.info("🔒 Sistem kilitleri kapatılıyor...")
+                if keep_constraints_off:
+                    conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? CHECK CONSTRAINT all'"))
+                conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? ENABLE TRIGGER all'"))
+        except: pass
+
+    finally:
+        value_pool.close_pools()
+
     logger.info("🏁 İŞLEM TAMAMLANDI.")
 
-if __name__ == "__main__":
+# =====================================================================
+# SUBSET & MASK MODU
+# =====================================================================
+
+# Kolon adında geçen anahtar kelime -> maske türü (sıra önemli: TCKN, VKN'den önce)
+PII_KEYWORDS = [
+    ('TCKN', 'TCKN'), ('VKN', 'VKN'), ('IBAN', 'IBAN'),
+    ('MAIL', 'MAIL'), ('EPOSTA', 'MAIL'),
+    ('TEL', 'TEL'), ('GSM', 'TEL'),
+    ('ADRES', 'ADRES'),
+]
+# generate_config_v2.detect_provider'ın açıklamadan ürettiği kural -> maske türü
+PII_RULES = {
+    'numerify:###########': 'TCKN',
+    'numerify:##########': 'VKN',
+    'iban': 'IBAN',
+    'email': 'MAIL',
+    'phone_number': 'TEL',
+    'address': 'ADRES',
+}
+_MASK_ADDRESSES = None
+
+def load_rules(path=RULES_FILE):
+    if not os.path.exists(path): return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
-    main()
+def detect_pii(table_name, col_name, rules):
+    """Kolon PII mi? Önce isimdeki anahtar kelimeye, sonra açıklamadan çıkarılmış kurala bakar."""
+    col_upper = col_name.upper()
+    for key, kind in PII_KEYWORDS:
+        if key in col_upper:
+            return kind
+    return PII_RULES.get(rules.get(table_name, {}).get(col_name))
+
+def _mask_addresses():
+    # Sabit seed ile üretilen adres listesi: aynı girdi her çalıştırmada aynı adrese düşer
+    global _MASK_ADDRESSES
+    if _MASK_ADDRESSES is None:
+        f = Faker(FAKER_LOCALE)
+        f.seed_instance(0)
+        _MASK_ADDRESSES = np.array([f.address().replace("\n", " ")[:100] for _ in range(1000)], dtype=object)
+    return _MASK_ADDRESSES
+
+def mask_series(series, kind):
+    """
+    Deterministik, vektörel maskeleme: aynı gerçek değer her zaman aynı sahte değere döner
+    (tablolar arası join'ler bozulmaz). NULL değerler korunur.
+    """
+    present = series.notna()
+    if not present.any(): return series
+    vals = series[present].astype(str)
+    h = pd.util.hash_pandas_object(vals, index=False, hash_key=MASK_SALT).to_numpy(dtype=np.uint64)
+
+    if kind == 'TCKN':
+        masked = (h % np.uint64(90_000_000_000) + np.uint64(10_000_000_000)).astype(np.int64)
+    elif kind == 'VKN':
+        masked = (h % np.uint64(9_000_000_000) + np.uint64(1_000_000_000)).astype(np.int64)
+    elif kind == 'TEL':
+        masked = "05" + pd.Series(h % np.uint64(300_000_000) + np.uint64(300_000_000)).astype(str).to_numpy(dtype=object)
+    elif kind == 'IBAN':
+        digits = pd.Series(h).astype(str).str.zfill(24).str[-24:]
+        masked = ("TR" + digits).to_numpy(dtype=object)
+    elif kind == 'MAIL':
+        masked = "user" + pd.Series(h % np.uint64(10_000_000_000)).astype(str).to_numpy(dtype=object) + "@example.com"
+    elif kind == 'ADRES':
+        pool = _mask_addresses()
+        masked = pool[(h % np.uint64(len(pool))).astype(np.int64)]
+    else:
+        return series
+
+    # Sayısal kolonlarda (örn. bigint TCKN) tip korunur, diğerleri metin olarak yazılır
+    if kind in ('TCKN', 'VKN') and not pd.api.types.is_numeric_dtype(series):
+        masked = masked.astype(str).astype(object)
+    out = series.astype(object)
+    out[present] = masked
+    return out
+
+def mask_frame(df, table, pii_cols):
+    """Tablonun PII kolonlarını maskeler ve kolon uzunluğuna göre kırpar."""
+    for col, kind in pii_cols.items():
+        if col not in df.columns: continue
+        df[col] = mask_series(df[col], kind)
+        length = getattr(table.c[col].type, 'length', None)
+        if length and length > 0:
+            df[col] = df[col].map(lambda v: v[:length] if isinstance(v, str) else v)
+    return df
+
+def _py(value):
+    # numpy skalerlerini DB sürücüsünün bağlayabileceği Python tiplerine çevir
+    return value.item() if hasattr(value, 'item') else value
+
+class SubsetWalker:
+    """
+    Kaynak DB'de FK grafiğini (get_fk_map) kök tablolardan başlayarak gezer:
+      1. Kök tablolardan PK sırasına göre limitli satır alır.
+      2. Aşağı doğru: seçilen satırlara referans veren child satırları çeker (limit SQL'de uygulanır).
+      3. Yukarı kapanış: seçilen her satırın parent'ı da örneğe eklenene kadar devam eder.
+    Gezinti sırasında sadece PK ve FK değerleri tutulur; satırların tamamı yazma
+    aşamasında stream() ile PK parçaları halinde tekrar okunur.
+    """
+
+    def __init__(self, conn, fk_map, max_rows=SUBSET_MAX_ROWS, chunk=SUBSET_CHUNK):
+        self.conn = conn
+        self.fk_map = fk_map
+        self.max_rows = max_rows
+        self.chunk = chunk
+        self.meta = MetaData()
+        self.inspector = inspect(conn)
+        self.keys = {}     # {tablo: set(pk)}  -> PK'lı tablolar
+        self.rows = {}     # {tablo: [DataFrame]} -> PK'sız tablolar (sadece child olabilirler)
+        self.refs = {}     # {tablo: {kolon: set(parent pk)}}
+        self.children = {} # {parent: [(child, kolon)]}
+        self._pks = {}
+        for child, cols in fk_map.items():
+            for col, parent in cols.items():
+                self.children.setdefault(parent, []).append((child, col))
+
+    def table(self, name):
+        if name not in self.meta.tables:
+            Table(name, self.meta, autoload_with=self.conn)
+        return self.meta.tables[name]
+
+    def pk(self, name):
+        if name not in self._pks:
+            cols = self.inspector.get_pk_constraint(name).get('constrained_columns') or []
+            self._pks[name] = cols[0] if len(cols) == 1 else None
+        return self._pks[name]
+
+    def tables(self):
+        return list(self.keys) + list(self.rows)
+
+    def size(self, name):
+        if name in self.keys: return len(self.keys[name])
+        return sum(len(df) for df in self.rows.get(name, []))
+
+    def read(self, stmt):
+        return pd.read_sql(stmt, self.conn, dtype_backend='numpy_nullable')
+
+    def key_select(self, name):
+        """Gezinti için sadece PK + FK kolonları okunur; PK'sız tabloda tüm satır gerekir."""
+        t = self.table(name)
+        pk = self.pk(name)
+        if not pk: return select(t)
+        cols = [pk] + [c for c in self.fk_map.get(name, {}) if c != pk and c in t.c]
+        stmt = select(*[t.c[c] for c in cols])
+        return stmt.order_by(t.c[pk])
+
+    def add(self, name, df):
+        """Yeni satırları örneğe ekler, gerçekten yeni olan PK'ları döner."""
+        if df is None or df.empty: return []
+        pk = self.pk(name)
+        if pk:
+            seen = self.keys.setdefault(name, set())
+            ids = [_py(v) for v in df[pk].tolist()]
+            mask = [v not in seen for v in ids]
+            df = df[mask].drop_duplicates(subset=[pk])
+            if df.empty: return []
+            new_ids = [_py(v) for v in df[pk].tolist()]
+            seen.update(new_ids)
+        else:
+            df = df.drop_duplicates()
+            self.rows.setdefault(name, []).append(df)
+            new_ids = []
+        refs = self.refs.setdefault(name, {})
+        for col in self.fk_map.get(name, {}):
+            if col in df.columns:
+                refs.setdefault(col, set()).update(_py(v) for v in df[col].dropna().tolist())
+        return new_ids
+
+    def pull(self, name, col, ids, limit=None):
+        """
+        WHERE col IN (...) sorgusunu parça parça çalıştırır. Limit verilirse kalan yer
+        her parçada SQL'e LIMIT/TOP olarak iner ve limit dolunca okuma durur.
+        """
+        t = self.table(name)
+        ids = [_py(v) for v in ids]
+        new_ids = []
+        for i in range(0, len(ids), self.chunk):
+            stmt = self.key_select(name).where(t.c[col].in_(ids[i:i + self.chunk]))
+            if limit is not None:
+                room = limit - self.size(name)
+                if room <= 0: break
+                stmt = stmt.limit(room)
+            new_ids.extend(self.add(name, self.read(stmt)))
+        return new_ids
+
+    def walk(self, roots):
+        queue = []
+        for root, limit in roots.items():
+            new = self.add(root, self.read(self.key_select(root).limit(limit)))
+            if new: queue.append((root, new))
+
+        # Aşağı yön: seçilen parent satırlarına bağlı child satırları
+        while queue:
+            parent, ids = queue.pop(0)
+            for child, col in self.children.get(parent, []):
+                # Self-reference aşağı yönde izlenmez (kök limiti delinir); gereken parent'lar yukarı kapanışla gelir
+                if child == parent: continue
+                new = self.pull(child, col, ids, limit=self.max_rows)
+                if new: queue.append((child, new))
+
+        # Yukarı kapanış: örnekteki her FK değerinin parent satırı da örnekte olmalı
+        changed = True
+        while changed:
+            changed = False
+            for name in list(self.refs):
+                for col, values in list(self.refs[name].items()):
+                    parent = self.fk_map[name][col]
+                    parent_pk = self.pk(parent)
+                    if not parent_pk: continue
+                    needed = values - self.keys.get(parent, set())
+                    if needed and self.pull(parent, parent_pk, sorted(needed, key=str)):
+                        changed = True
+        return self.tables()
+
+    def stream(self, name):
+        """Seçilen satırları kaynaktan PK parçaları halinde okur (tüm örnek bellekte tutulmaz)."""
+        if name in self.rows:
+            yield from self.rows[name]
+            return
+        t = self.table(name)
+        pk = self.pk(name)
+        keys = sorted(self.keys.get(name, ()), key=str)
+        for i in range(0, len(keys), self.chunk):
+            yield self.read(select(t).where(t.c[pk].in_(keys[i:i + self.chunk])).order_by(t.c[pk]))
+
+def write_order(tables, fk_map):
+    """Parent -> Child yazım sırası. Döngüler fk_resolver ile SCC bazında kırılır."""
+    order, _, _ = fk_resolver.resolve_insert_order(tables, fk_map, lambda t, c: True)
+    return order
+
+def writable_columns(table):
+    """Hedefe değer basılabilecek kolonlar: timestamp/rowversion ve computed kolonlar hariç."""
+    return [c.name for c in table.columns
+            if c.computed is None and not isinstance(c.type, MSSQL_TIMESTAMP)]
+
+def run_subset(source_engine=None, target_engine=None, roots=None, rules=None):
+    """Kaynak DB'den tutarlı alt küme çekip PII kolonlarını maskeleyerek hedefe toplu yazar."""
+    if source_engine is None:
+        params = urllib.parse.quote_plus(SOURCE_CONN_STR)
+        source_engine = create_engine(f"mssql+pyodbc:///?odbc_connect={params}")
+    target_engine = target_engine or get_engine()
+    roots = roots if roots is not None else SUBSET_ROOTS
+    rules = rules if rules is not None else load_rules()
+
+    with source_engine.connect() as src:
+        logger.info("🔗 Kaynak ilişki haritası (FK) çıkarılıyor...")
+        fk_map = get_fk_map(src)
+        walker = SubsetWalker(src, fk_map)
+        logger.info(f"🌱 {len(roots)} kök tablodan alt küme çıkarılıyor...")
+        order = write_order(walker.walk(roots), fk_map)
+
+        # PII olan PK'lar (örn. TCKN) ve onlara bağlı FK'lar aynı türle maskelenir;
+        # maske deterministik olduğu için join'ler bozulmaz
+        pk_kinds = {}
+        for name in order:
+            pk = walker.pk(name)
+            if pk: pk_kinds[name] = detect_pii(name, pk, rules)
+            for parent in fk_map.get(name, {}).values():
+                if parent not in pk_kinds and walker.pk(parent):
+                    pk_kinds[parent] = detect_pii(parent, walker.pk(parent), rules)
+
+        logger.info(f"🚀 {len(order)} tablo maskelenip hedefe yazılıyor...")
+        is_mssql = target_engine.dialect.name == 'mssql'
+        if is_mssql:
+            with target_engine.begin() as conn:
+                conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? NOCHECK CONSTRAINT all'"))
+                conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? DISABLE TRIGGER all'"))
+
+        for i, name in enumerate(order, 1):
+            table = walker.table(name)
+            columns = writable_columns(table)
+            my_fks = fk_map.get(name, {})
+            pii_cols = {}
+            for col in columns:
+                if col in my_fks:
+                    kind = pk_kinds.get(my_fks[col])
+                elif col == walker.pk(name):
+                    kind = pk_kinds.get(name)
+                else:
+                    kind = detect_pii(name, col, rules)
+                if kind: pii_cols[col] = kind
+
+            # Tek tek her tablo için işlem (Transaction per table), hatalı tablo diğerlerini durdurmaz
+            try:
+                with target_engine.connect() as conn:
+                    has_identity = is_mssql and any(c.autoincrement is True or c.identity is not None for c in table.columns)
+                    if has_identity:
+                        conn.execute(text(f"SET IDENTITY_INSERT [{name}] ON"))
+                        conn.commit()
+                    try:
+                        written = 0
+                        with conn.begin():
+                            for df in walker.stream(name):
+                                df = mask_frame(df[columns], table, pii_cols)
+                                df.to_sql(name, conn, if_exists='append', index=False, chunksize=1000)
+                                written += len(df)
+                    finally:
+                        # IDENTITY_INSERT oturum ayarıdır, rollback geri almaz: havuza açık dönmesin
+                        if has_identity:
+                            conn.execute(text(f"SET IDENTITY_INSERT [{name}] OFF"))
+                            conn.commit()
+                    masked = f" (maskelenen: {', '.join(pii_cols)})" if pii_cols else ""
+                    logger.info(f"✅ ({i}/{len(order)}) {name}: {written} kayıt kopyalandı{masked}.")
+            except Exception as e:
+                err = str(e).split(']')[0]
+                logger.error(f"❌ {name}: {err}")
+
+    if is_mssql:
+        try:
+            with target_engine.begin() as conn:
+                logger.info("🔒 Sistem kilitleri kapatılıyor...")
+                conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? CHECK CONSTRAINT all'"))
+                conn.execute(text("EXEC sp_msforeachtable 'ALTER TABLE ? ENABLE TRIGGER all'"))
+        except: pass
+
+    logger.info("🏁 İŞLEM TAMAMLANDI.")
+
+if __name__ == "__main__":
+    if MODE == 'subset':
+        run_subset()
+    else:
+        main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modüller repo kökünde düz script olarak duruyor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
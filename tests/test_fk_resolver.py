@@ -0,0 +1,61 @@
+import fk_resolver
+
+
+def nullable(*not_null):
+    return lambda table, col: (table, col) not in set(not_null)
+
+
+def assert_parents_first(order, fk_map, deferred):
+    pos = {t: i for i, t in enumerate(order)}
+    for child, cols in fk_map.items():
+        for col, parent in cols.items():
+            if col in deferred.get(child, {}): continue
+            assert pos[parent] < pos[child], f"{parent} -> {child}"
+
+
+def test_self_reference_is_deferred():
+    fk_map = {'CariHesap': {'FaturaHesapId': 'CariHesap', 'MusterekHesapId': 'CariHesap', 'SehirId': 'Sehir'}}
+    order, deferred, forced = fk_resolver.resolve_insert_order(['CariHesap', 'Sehir'], fk_map, nullable())
+
+    assert order == ['Sehir', 'CariHesap']
+    assert deferred == {'CariHesap': {'FaturaHesapId': 'CariHesap', 'MusterekHesapId': 'CariHesap'}}
+    assert forced == []
+
+
+def test_nullable_cycle_defers_one_nullable_edge():
+    # A -> B -> C -> A döngüsü, sadece C.AId NULL olabilir; D döngü dışında
+    fk_map = {'A': {'CId': 'C'}, 'B': {'AId': 'A'}, 'C': {'BId': 'B'}, 'D': {'AId': 'A'}}
+    order, deferred, forced = fk_resolver.resolve_insert_order(
+        ['A', 'B', 'C', 'D'], fk_map, nullable(('A', 'CId'), ('B', 'AId')))
+
+    assert deferred == {'C': {'BId': 'B'}}
+    assert forced == []
+    assert sorted(order) == ['A', 'B', 'C', 'D']
+    assert_parents_first(order, fk_map, deferred)
+
+
+def test_not_null_cycle_is_forced():
+    fk_map = {'A': {'BId': 'B'}, 'B': {'AId': 'A'}}
+    order, deferred, forced = fk_resolver.resolve_insert_order(
+        ['A', 'B'], fk_map, nullable(('A', 'BId'), ('B', 'AId')))
+
+    assert sum(len(cols) for cols in deferred.values()) == 1
+    (child, cols), = deferred.items()
+    assert forced == [(child, next(iter(cols)))]
+    assert_parents_first(order, fk_map, deferred)
+
+
+def test_acyclic_graph_defers_nothing():
+    fk_map = {'Fatura': {'CariId': 'Cari'}, 'FaturaSatir': {'FaturaId': 'Fatura', 'StokId': 'Stok'}}
+    order, deferred, forced = fk_resolver.resolve_insert_order(
+        ['FaturaSatir', 'Fatura', 'Stok', 'Cari'], fk_map, nullable())
+
+    assert deferred == {} and forced == []
+    assert_parents_first(order, fk_map, deferred)
+
+
+def test_identity_key_range_uses_two_parameters():
+    # Identity tablolarda anahtar sayısından bağımsız olarak sadece BETWEEN :lo AND :hi kullanılır
+    sql, params = fk_resolver.key_filter(None, 'CariHesap', 'Id', (101, 5100))
+    assert sql == "BETWEEN :lo AND :hi"
+    assert params == {"lo": 101, "hi": 5100}
@@ -0,0 +1,130 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+import run_engine
+
+DDL = [
+    "CREATE TABLE Cari (Id INTEGER PRIMARY KEY, Unvan TEXT, TCKN INTEGER, Mail VARCHAR(30), ParentId INTEGER REFERENCES Cari(Id))",
+    "CREATE TABLE Fatura (Id INTEGER PRIMARY KEY, CariId INTEGER REFERENCES Cari(Id), Tutar REAL, Adres VARCHAR(40))",
+    "CREATE TABLE FaturaSatir (Id INTEGER PRIMARY KEY, FaturaId INTEGER REFERENCES Fatura(Id), Miktar INTEGER)",
+]
+
+
+def parent_of(i):
+    # 1..5 -> 46..50 (yukarı), 6..45 -> i-5 (1..5'in altında zincir), 46..50 kök
+    if i <= 5: return i + 45
+    if i <= 45: return i - 5
+    return None
+
+
+def make_db(path, rows=True):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for ddl in DDL:
+            conn.execute(text(ddl))
+        if rows:
+            for i in range(1, 51):
+                conn.execute(text("INSERT INTO Cari VALUES (:i, :u, :t, :m, :p)"), dict(
+                    i=i, u=f"Firma{i}", t=12345678900 + i,
+                    m=f"cari{i}@firma.com" if i % 3 else None,
+                    p=parent_of(i)))
+                conn.execute(text("INSERT INTO Fatura VALUES (:i, :c, 10.5, :a)"), dict(i=i, c=i, a=f"Gerçek adres {i}"))
+                conn.execute(text("INSERT INTO FaturaSatir VALUES (:i, :f, 3)"), dict(i=i, f=i))
+    return engine
+
+
+def fetch(engine, sql):
+    with engine.connect() as conn:
+        return conn.execute(text(sql)).fetchall()
+
+
+@pytest.fixture
+def source(tmp_path):
+    return make_db(tmp_path / "source.db")
+
+
+def run(source, target_path):
+    target = make_db(target_path, rows=False)
+    run_engine.run_subset(source, target, {'Cari': 5}, rules={})
+    return target
+
+
+def test_subset_keeps_fk_closure(source, tmp_path):
+    target = run(source, tmp_path / "target.db")
+
+    cari_ids = {r[0] for r in fetch(target, "SELECT Id FROM Cari")}
+    # Kök limiti korunur: self-reference child'ları çekilmez, sadece gereken parent'lar gelir
+    assert cari_ids == {1, 2, 3, 4, 5, 46, 47, 48, 49, 50}
+    assert {r[0] for r in fetch(target, "SELECT CariId FROM Fatura")} == {1, 2, 3, 4, 5}
+    assert {r[0] for r in fetch(target, "SELECT FaturaId FROM FaturaSatir")} == {1, 2, 3, 4, 5}
+    with target.connect() as conn:
+        assert conn.execute(text("PRAGMA foreign_key_check")).fetchall() == []
+
+
+def test_subset_masks_pii_deterministically(source, tmp_path):
+    first = run(source, tmp_path / "first.db")
+    second = run(source, tmp_path / "second.db")
+
+    query = "SELECT Id, Unvan, TCKN, Mail, ParentId FROM Cari ORDER BY Id"
+    rows = fetch(first, query)
+    assert rows == fetch(second, query)
+    assert fetch(first, "SELECT Adres FROM Fatura ORDER BY Id") == fetch(second, "SELECT Adres FROM Fatura ORDER BY Id")
+
+    originals = {r[0]: r for r in fetch(source, query)}
+    for id_, unvan, tckn, mail, parent in rows:
+        orig = originals[id_]
+        assert unvan == orig[1]
+        assert parent == orig[4]
+        assert tckn != orig[2] and 10000000000 <= tckn <= 99999999999
+        if orig[3] is None:
+            assert mail is None
+        else:
+            assert mail != orig[3] and mail.endswith("@example.com")
+    assert all(not a.startswith("Gerçek") for (a,) in fetch(first, "SELECT Adres FROM Fatura"))
+
+
+def test_subset_limit_is_pushed_into_sql(source):
+    with source.connect() as conn:
+        walker = run_engine.SubsetWalker(conn, run_engine.get_fk_map(conn), max_rows=2, chunk=2)
+        read_rows = []
+        original = walker.read
+
+        def counting_read(stmt):
+            df = original(stmt)
+            read_rows.append(len(df))
+            return df
+        walker.read = counting_read
+        walker.walk({'Cari': 5})
+
+        assert walker.size('Fatura') == 2
+        assert walker.size('FaturaSatir') == 2
+        # Limit dolunca kalan parçalar hiç okunmaz: 5 Cari + 2 Fatura + 2 FaturaSatir (+ yukarı kapanış Cari'leri)
+        assert sum(read_rows) == 5 + 2 + 2 + 5
+        assert [len(df) for df in walker.stream('Fatura')] == [2]
+
+
+def test_subset_masks_pii_keys_consistently(tmp_path):
+    ddl = [
+        "CREATE TABLE Kisi (TCKN INTEGER PRIMARY KEY, Unvan TEXT)",
+        "CREATE TABLE KisiAdres (Id INTEGER PRIMARY KEY, KisiNo INTEGER REFERENCES Kisi(TCKN), Sehir TEXT)",
+    ]
+    engines = []
+    for db in ("source.db", "target.db"):
+        engine = create_engine(f"sqlite:///{tmp_path / db}")
+        with engine.begin() as conn:
+            for sql in ddl:
+                conn.execute(text(sql))
+        engines.append(engine)
+    source, target = engines
+    with source.begin() as conn:
+        for i in range(1, 6):
+            conn.execute(text("INSERT INTO Kisi VALUES (:t, :u)"), dict(t=12345678900 + i, u=f"Kişi{i}"))
+            conn.execute(text("INSERT INTO KisiAdres VALUES (:i, :t, 'Ankara')"), dict(i=i, t=12345678900 + i))
+
+    run_engine.run_subset(source, target, {'Kisi': 5}, rules={})
+
+    original = {r[0] for r in fetch(source, "SELECT TCKN FROM Kisi")}
+    masked = {r[0] for r in fetch(target, "SELECT TCKN FROM Kisi")}
+    assert len(masked) == 5 and not masked & original
+    refs = {r[0] for r in fetch(target, "SELECT KisiNo FROM KisiAdres")}
+    assert refs == masked
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+import value_pool
+
+
+@pytest.fixture(autouse=True)
+def clean_pools():
+    value_pool.close_pools()
+    yield
+    value_pool.close_pools()
+
+
+def counter(prefix="deger"):
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return f"{prefix}-{len(calls)}-ş"
+    return generate, calls
+
+
+def test_build_then_reopen_reuses_file(tmp_path):
+    generate, calls = counter()
+    pool = value_pool.get_pool('UNVAN', generate, 'tr_TR', size=50, pool_dir=tmp_path)
+    values = [pool[i] for i in range(len(pool))]
+    assert len(values) == 50 and values[0] == "deger-1-ş"
+    assert len(calls) == 50
+
+    value_pool.close_pools()
+    pool = value_pool.get_pool('UNVAN', generate, 'tr_TR', size=50, pool_dir=tmp_path)
+    assert [pool[i] for i in range(len(pool))] == values
+    assert len(calls) == 50  # Yeniden üretilmedi
+    assert pool.sample() in values
+
+
+def test_locale_or_rule_change_rebuilds(tmp_path):
+    generate, calls = counter()
+    first = value_pool.get_pool('ADRES', generate, 'tr_TR', size=10, pool_dir=tmp_path)
+    assert first[0] == "deger-1-ş"
+
+    # Aynı süreçte locale değişince önbellekteki havuz dönmemeli
+    second = value_pool.get_pool('ADRES', generate, 'en_US', size=10, pool_dir=tmp_path)
+    assert len(calls) == 20 and second[0] == "deger-11-ş"
+
+    third = value_pool.get_pool('ADRES', lambda: "yeni kural", 'en_US', size=10, pool_dir=tmp_path)
+    assert third[0] == "yeni kural"
+
+
+def test_value_larger_than_max_bytes_raises_and_falls_back(tmp_path):
+    with pytest.raises(ValueError):
+        value_pool.get_pool('NOT', lambda: "x" * 100, 'tr_TR', size=5, pool_dir=tmp_path, max_bytes=10)
+    assert os.listdir(tmp_path) == []
+
+    generate = lambda: "x" * 100
+    providers = value_pool.pooled_providers({'NOT': generate}, ['NOT'], 'tr_TR', size=5, pool_dir=tmp_path, max_bytes=10)
+    assert providers['NOT'] is generate
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: data[:20],                          # başlık kesik
+    lambda data: data[:value_pool.HEADER.size + 12], # offset tablosu kesik
+    lambda data: data[:-3],                          # veri bloğu kesik
+    lambda data: b"BOZUKDSY" + data[8:],             # MAGIC bozuk
+    lambda data: b"",                                # boş dosya
+])
+def test_corrupt_file_is_rebuilt(tmp_path, corrupt):
+    generate, calls = counter()
+    value_pool.get_pool('SEHIR', generate, 'tr_TR', size=5, pool_dir=tmp_path)
+    value_pool.close_pools()
+
+    path = tmp_path / "SEHIR.pool"
+    path.write_bytes(corrupt(path.read_bytes()))
+
+    pool = value_pool.get_pool('SEHIR', generate, 'tr_TR', size=5, pool_dir=tmp_path)
+    assert len(calls) == 10
+    assert [pool[i] for i in range(len(pool))] == [f"deger-{i}-ş" for i in range(6, 11)]
@@ -0,0 +1,174 @@
+import os
+import mmap
+import struct
+import random
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# --- AYARLAR ---
+POOL_DIR = ".value_pools"
+POOL_SIZE = 20000                    # Her sağlayıcı için önceden üretilecek değer sayısı
+MAX_POOL_BYTES = 16 * 1024 * 1024    # Tek bir havuz dosyasının veri bloğu için üst sınır
+
+# Dosya düzeni: [MAGIC 8][fingerprint 32][count 8][offsets (count+1)*8][utf-8 veri]
+MAGIC = b"VPOOL001"
+HEADER = struct.Struct("<8s32sQ")
+
+_POOLS = {}  # Süreç içi önbellek: {(isim, fingerprint): ValuePool}
+
+
+def rule_fingerprint(name, generator, locale, size):
+    """
+    Havuzun geçerliliğini belirleyen özet.
+    Lambda'nın bytecode'u ve sabitleri değişirse (kural değişti) ya da locale/boyut
+    değişirse farklı bir özet çıkar ve havuz yeniden üretilir.
+    """
+    code = getattr(generator, "__code__", None)
+    h = hashlib.sha256()
+    h.update(f"{name}|{locale}|{size}".encode("utf-8"))
+    if code is not None:
+        h.update(code.co_code)
+        h.update(repr(code.co_consts).encode("utf-8"))
+        h.update(repr(code.co_names).encode("utf-8"))
+    else:
+        h.update(repr(generator).encode("utf-8"))
+    return h.digest()
+
+
+class ValuePool:
+    """Diskteki havuz dosyasını salt okunur mmap ile açar, değerleri index ile okur."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = self._mm = self._offsets = None
+        try:
+            self._file = open(path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            size = len(self._mm)
+            if size < HEADER.size:
+                raise ValueError("başlık eksik")
+            magic, self.fingerprint, self.count = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise ValueError("MAGIC uyuşmuyor")
+            offsets_start = HEADER.size
+            self._data_start = offsets_start + (self.count + 1) * 8
+            if size < self._data_start:
+                raise ValueError("offset tablosu kesik")
+            # Kopyasız erişim: offset tablosu doğrudan mmap üzerinden okunur
+            self._offsets = memoryview(self._mm)[offsets_start:self._data_start].cast("Q")
+            if self._data_start + self._offsets[self.count] > size:
+                raise ValueError("veri bloğu kesik")
+        except Exception as e:
+            # Yarım açılmış dosya/mmap kalmasın (Windows'ta os.replace'i engeller)
+            self.close()
+            raise ValueError(f"Geçersiz havuz dosyası: {path} ({e})") from e
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        start = self._data_start + self._offsets[idx]
+        end = self._data_start + self._offsets[idx + 1]
+        return self._mm[start:end].decode("utf-8")
+
+    def sample(self):
+        return self[random.randrange(self.count)]
+
+    def close(self):
+        if getattr(self, "_offsets", None) is not None:
+            self._offsets.release()
+            self._offsets = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def build_pool(path, generator, fingerprint, size=POOL_SIZE, max_bytes=MAX_POOL_BYTES):
+    """Değerleri üretip havuz dosyasını yazar. Önce geçici dosyaya yazar, sonra atomik taşır."""
+    offsets = [0]
+    chunks = []
+    total = 0
+    for _ in range(size):
+        raw = str(generator()).encode("utf-8")
+        if total + len(raw) > max_bytes:
+            break
+        chunks.append(raw)
+        total += len(raw)
+        offsets.append(total)
+
+    count = len(chunks)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, fingerprint, count))
+        f.write(struct.pack(f"<{count + 1}Q", *offsets))
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+    return count
+
+
+def get_pool(name, generator, locale, size=POOL_SIZE, pool_dir=POOL_DIR, max_bytes=MAX_POOL_BYTES):
+    """
+    İsimle havuz döner. Dosya yoksa veya özet (locale/kural/boyut) tutmuyorsa
+    havuzu yeniden üretir. Aynı süreç içinde açılmış havuz tekrar kullanılır.
+    """
+    fingerprint = rule_fingerprint(name, generator, locale, size)
+    if (name, fingerprint) in _POOLS:
+        return _POOLS[(name, fingerprint)]
+    # Aynı isimle eski kurala/locale'e ait açık havuz varsa dosya değişmeden önce kapat
+    for key in [k for k in _POOLS if k[0] == name]:
+        _POOLS.pop(key).close()
+
+    os.makedirs(pool_dir, exist_ok=True)
+    path = os.path.join(pool_dir, f"{name}.pool")
+
+    pool = None
+    if os.path.exists(path):
+        try:
+            pool = ValuePool(path)
+            if pool.fingerprint != fingerprint or len(pool) == 0:
+                pool.close()
+                pool = None
+        except ValueError:
+            pool = None
+
+    if pool is None:
+        count = build_pool(path, generator, fingerprint, size, max_bytes)
+        if count == 0:
+            # Tek bir değer bile max_bytes'a sığmadı: havuz kullanılamaz
+            os.remove(path)
+            raise ValueError(f"{name} havuzu boş: ilk değer {max_bytes} byte sınırını aşıyor.")
+        logger.info(f"   🧺 {name} havuzu üretildi ({count} değer).")
+        pool = ValuePool(path)
+
+    _POOLS[(name, fingerprint)] = pool
+    return pool
+
+
+def pooled_providers(providers, keys, locale, size=POOL_SIZE, pool_dir=POOL_DIR, max_bytes=MAX_POOL_BYTES):
+    """
+    Verilen sağlayıcı sözlüğündeki seçili anahtarları havuzdan okuyan
+    fonksiyonlarla değiştirilmiş bir kopya döner.
+    """
+    result = dict(providers)
+    for key in keys:
+        if key not in providers: continue
+        try:
+            pool = get_pool(key, providers[key], locale, size, pool_dir, max_bytes)
+        except ValueError as e:
+            # Havuz üretilemezse orijinal sağlayıcı kullanılmaya devam eder
+            logger.warning(f"   ⚠️ {e} Orijinal sağlayıcı kullanılacak.")
+            continue
+        result[key] = pool.sample
+    return result
+
+
+def close_pools():
+    for pool in _POOLS.values():
+        pool.close()
+    _POOLS.clear()